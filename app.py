@@ -1,146 +1,413 @@
-from flask import Flask, render_template, request, jsonify
-import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-import requests
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, abort, send_from_directory
+import numpy as np
+import json
+import mimetypes
 import os
 import random
+import itertools
+import functools
+import hmac
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import assets
+import train_model
+from encoder import FeatureEncoder
+from metrics import registry
+from products import ANSWER_OPTIONS, PRODUCTS_DB
+import weather
 
 app = Flask(__name__)
 
+registry.describe('model_loads_total', 'counter', 'Cargas del modelo por origen (artefacto, entrenamiento o recarga en caliente).')
+registry.describe('model_load_seconds_total', 'counter', 'Segundos totales cargando o entrenando el modelo.')
+registry.describe('model_retrains_total', 'counter', 'Reentrenamientos en segundo plano por resultado.')
+registry.describe('model_retrain_seconds_total', 'counter', 'Segundos totales de reentrenamiento en segundo plano.')
+registry.describe('sales_ingested_total', 'counter', 'Ventas validadas agregadas al CSV.')
+registry.describe('recommend_stage_seconds', 'histogram', 'Latencia de cada etapa de la recomendación.')
+registry.describe('recommend_request_seconds', 'histogram', 'Latencia total de la recomendación.')
+registry.describe('recommend_lookup_total', 'counter', 'Consultas a la tabla precalculada (hit o miss).')
+registry.describe('recommend_random_fallback_total', 'counter', 'Recomendaciones al azar porque falló la predicción (ValueError).')
+registry.describe('recommend_unknown_answers_total', 'counter', 'Respuestas que no aparecen en el CSV de entrenamiento, por campo.')
+registry.describe('recommend_coherence_correction_total', 'counter', 'Predicciones corregidas por no coincidir con la categoría elegida.')
+registry.describe('recommend_errors_total', 'counter', 'Errores internos (500) al recomendar.')
+registry.describe('http_requests_total', 'counter', 'Peticiones atendidas por ruta y código de estado.')
+registry.describe('weather_default_total', 'counter', 'Veces que se usó el clima por defecto.')
+registry.describe('weather_fetch_errors_total', 'counter', 'Fallos al consultar el backend de clima.')
+registry.describe('weather_fetch_seconds', 'histogram', 'Latencia de las consultas al backend de clima (en segundo plano).')
+
 # --- Lógica de la Inteligencia Artificial ---
-features = ['tipo_producto_general', 'tipo_antojo', 'base', 'tipo_sabor', 'weather']
+features = train_model.features
+MAX_K = 10
+CITY = 'Mexico City'
+
+# Tabla de respuestas precalculada: las respuestas posibles son un conjunto finito
+# (las categorías vistas en el CSV), así que predecimos todas las combinaciones de
+# una vez y servimos cada petición con una búsqueda en un diccionario. Se puede
+# desactivar con USE_LOOKUP_TABLE=0.
+USE_LOOKUP_TABLE = os.environ.get('USE_LOOKUP_TABLE', '1') != '0'
+# Cada combinación guarda una fila completa de predict_proba: por encima de este
+# límite la tabla no se construye y todas las peticiones usan el modelo
+LOOKUP_TABLE_MAX_COMBINATIONS = int(os.environ.get('LOOKUP_TABLE_MAX_COMBINATIONS', '20000'))
+
+def _normalize_category(category):
+    # Se eliminan las 's' para comparar singular vs plural (Paleta vs Paletas)
+    return category.lower().replace('s', '')
+
+# Índice de categorías: categoría normalizada -> productos del menú
+CATEGORY_INDEX = {}
+for p_id, p_info in PRODUCTS_DB.items():
+    CATEGORY_INDEX.setdefault(_normalize_category(p_info['category']), []).append(p_id)
+
+
+class ModelBundle:
+    """Todo lo que depende de un modelo entrenado, para poder reemplazarlo de una vez.
+
+    Agrupa el modelo, su codificador, la tabla de respuestas precalculada y las
+    posiciones de cada categoría en las columnas de predict_proba. Cada petición
+    toma la referencia al bundle actual al empezar, así que una recarga en caliente
+    nunca la deja a medias.
+    """
+
+    def __init__(self, artifact, signature=None):
+        self.model = artifact['model']
+        self.feature_encoder = FeatureEncoder(features, artifact['categories'])
+        self.signature = signature
+
+        # Posiciones de los productos de cada categoría en las columnas de predict_proba,
+        # para ordenar por probabilidad dentro de la categoría sin recorrer todo el menú
+        class_positions = {p_id: i for i, p_id in enumerate(self.model.classes_)}
+        self.category_class_positions = {
+            category: np.array([class_positions[p_id] for p_id in p_ids if p_id in class_positions], dtype=np.intp)
+            for category, p_ids in CATEGORY_INDEX.items()
+        }
+
+        self.lookup_table = self._build_lookup_table() if USE_LOOKUP_TABLE else {}
+        # Memorias por bundle: al recargar el modelo se descartan junto con él
+        self.category_candidates = functools.lru_cache(maxsize=256)(self._category_candidates)
+        self.ranked_from_table = functools.lru_cache(maxsize=4096)(self._ranked_from_table)
+
+    def _build_lookup_table(self):
+        size = 1
+        for f in features:
+            size *= len(self.feature_encoder.categories[f])
+        if size > LOOKUP_TABLE_MAX_COMBINATIONS:
+            print(f"Tabla de respuestas omitida: {size} combinaciones superan el límite de "
+                  f"{LOOKUP_TABLE_MAX_COMBINATIONS} (LOOKUP_TABLE_MAX_COMBINATIONS); se usará el modelo.")
+            return {}
+        combinations = list(itertools.product(*(self.feature_encoder.categories[f] for f in features)))
+        combinations_encoded = self.feature_encoder.encode_many([dict(zip(features, c)) for c in combinations])
+        # Se guardan las probabilidades completas para poder ordenar dentro de cada categoría
+        probabilities = self.model.predict_proba(combinations_encoded)
+        return dict(zip(combinations, probabilities))
+
+    def _category_candidates(self, chosen_type):
+        """Posiciones de predict_proba y productos coherentes con el tipo elegido."""
+        chosen_normalized = _normalize_category(chosen_type)
+        categories = [c for c in CATEGORY_INDEX if chosen_normalized in c]
+        if not categories:
+            # Sin categoría coherente se conserva la predicción sin restricciones
+            return np.arange(len(self.model.classes_)), tuple(PRODUCTS_DB)
+        positions = np.concatenate([self.category_class_positions[c] for c in categories])
+        products = tuple(p_id for c in categories for p_id in CATEGORY_INDEX[c])
+        return positions, products
+
+    def rank_products(self, probabilities, chosen_types, k=1):
+        """Top-k de productos por fila, restringido a la categoría elegida en esa fila.
+
+        Devuelve las listas de productos y, por fila, si la restricción cambió la
+        predicción sin restricciones (la corrección de coherencia).
+        """
+        rankings = [None] * len(chosen_types)
+        corrected = [False] * len(chosen_types)
+        for chosen_type in set(chosen_types):
+            rows = [i for i, t in enumerate(chosen_types) if t == chosen_type]
+            positions, products = self.category_candidates(chosen_type)
+            if len(positions) == 0:
+                # El modelo no conoce ningún producto de la categoría: se usa el orden del menú
+                for i in rows:
+                    rankings[i] = list(products[:k])
+                    corrected[i] = True
+                continue
+            for i, best in zip(rows, probabilities[rows].argmax(axis=1)):
+                corrected[i] = best not in positions
+            top_k = min(k, len(positions))
+            scores = probabilities[np.ix_(rows, positions)]
+            top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+            ranked = self.model.classes_[positions[np.take_along_axis(top, order, axis=1)]]
+            for i, product_ids in zip(rows, ranked):
+                rankings[i] = product_ids.tolist()
+        return rankings, corrected
+
+    def random_ranking(self, chosen_type, k=1):
+        # Para respuestas que el modelo no conoce: productos al azar de la categoría elegida
+        _, products = self.category_candidates(chosen_type)
+        return random.sample(products, min(k, len(products)))
+
+    def _ranked_from_table(self, answer_key, k):
+        rankings, corrected = self.rank_products(self.lookup_table[answer_key][np.newaxis, :], [answer_key[0]], k)
+        return tuple(rankings[0]), corrected[0]
+
+
+def _artifact_signature(path):
+    # Identifica la versión publicada del artefacto sin tener que abrirlo
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
 
 try:
-    # 1. Intenta cargar desde la carpeta raíz (donde ejecutas el script)
-    df = pd.read_csv('sales_data.csv')
-    df['product_id'] = df['product_id'].astype('category')
+    # Carga el modelo ya entrenado (modelo_ia.pkl); solo se reentrena si falta o
+    # quedó obsoleto. Con gunicorn --preload esto ocurre una sola vez en el proceso
+    # maestro y los workers comparten la memoria del modelo.
+    load_start = time.perf_counter()
+    artifact, trained = train_model.load_or_train()
+    bundle = ModelBundle(artifact, _artifact_signature(train_model.MODEL_FILE_PATH))
+    load_seconds = time.perf_counter() - load_start
+    registry.inc('model_loads_total', source='training' if trained else 'artifact')
+    registry.inc('model_load_seconds_total', load_seconds, source='training' if trained else 'artifact')
+    # Con --preload esto corre en el maestro: se vuelca ya para que cuente una sola vez
+    registry.flush()
+    if trained:
+        print(f"Modelo de IA entrenado correctamente en {artifact['train_seconds']:.2f} s.")
+    else:
+        print(f"Modelo de IA cargado en {load_seconds:.2f} s.")
+    if bundle.lookup_table:
+        print(f"Tabla de respuestas precalculada: {len(bundle.lookup_table)} combinaciones.")
 except FileNotFoundError:
-    try:
-        # 2. Si falla, intenta cargar desde la subcarpeta 'data/'
-        df = pd.read_csv('data/sales_data.csv')
-        df['product_id'] = df['product_id'].astype('category')
-    except FileNotFoundError:
-        # Si no se encuentra en ninguno de los dos lugares, genera el error.
-        print("\n=======================================================")
-        print("ERROR CRÍTICO: El archivo sales_data.csv no se encontró.")
-        print("Asegúrate de que esté en la misma carpeta que 'app.py' O en la subcarpeta 'data/'.")
-        print("=======================================================\n")
-        exit()
+    # Si no se encuentra el CSV ni el modelo guardado, genera el error.
+    print("\n=======================================================")
+    print("ERROR CRÍTICO: El archivo sales_data.csv no se encontró.")
+    print("Asegúrate de que esté en la misma carpeta que 'app.py' O en la subcarpeta 'data/'.")
+    print("=======================================================\n")
+    exit()
 except Exception as e:
-    print(f"Error al cargar o procesar el CSV: {e}")
+    print(f"Error al cargar o entrenar el modelo: {e}. Revisa tus datos.")
     exit()
 
-# Continuar con el entrenamiento
-X = pd.get_dummies(df[features])
-y = df['product_id']
+# --- Recarga en caliente ---
+# Cuando otro proceso publica un artefacto nuevo (os.replace sobre modelo_ia.pkl),
+# cada worker lo detecta con un os.stat cada MODEL_RELOAD_INTERVAL segundos, lo
+# carga en un hilo aparte y reemplaza el bundle con una sola asignación.
+MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', '5'))
+_next_reload_check = time.monotonic() + MODEL_RELOAD_INTERVAL
+_reload_lock = threading.Lock()
 
-try:
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
-    model.fit(X, y)
-    print("Modelo de IA entrenado correctamente.")
-except Exception as e:
-    print(f"Error al entrenar el modelo: {e}. Revisa tus datos.")
-    exit()
+def _reset_reload_lock():
+    global _reload_lock
+    _reload_lock = threading.Lock()
 
-# --- Funciones de Utilidad ---
-def get_weather_data(api_key, city):
-    base_url = "http://api.openweathermap.org/data/2.5/weather"
-    params = {'q': city, 'appid': api_key, 'units': 'metric', 'lang': 'es'}
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_reload_lock)
+
+def _reload_bundle(signature):
+    global bundle
     try:
-        response = requests.get(base_url, params=params, timeout=5)
-        data = response.json()
-        if data.get('cod') == 200:
-            weather_desc = data['weather'][0]['main'].lower()
-            if 'cloud' in weather_desc or 'mist' in weather_desc or 'fog' in weather_desc:
-                return 'nublado'
-            elif 'rain' in weather_desc or 'drizzle' in weather_desc or 'thunderstorm' in weather_desc:
-                return 'lluvioso'
-            elif 'clear' in weather_desc:
-                return 'soleado'
-            else:
-                return 'soleado'
-        else:
-            # Error de API, usa default
-            pass 
-    except requests.exceptions.RequestException:
-        # Error de conexión, usa default
-        pass 
-    return 'soleado' # Clima por defecto en caso de fallo
-
-# --- BASE DE DATOS DE PRODUCTOS ACTUALIZADA ---
-PRODUCTS_DB = {
-    # ...........................................PALETAS...........................#
-    'Paleta de Maracuya': {'name': 'Paleta de Maracuya', 'price': '$25', 'image': 'Pmaracuya.png', 'justification': 'Un toque ácido y tropical, ideal para refrescar.', 'category': 'Paletas'},
-    'Paleta de Piña': {'name': 'Paleta de Piña', 'price': '$25', 'image': 'Ppiña.png', 'justification': 'Dulce y refrescante, sabor que transporta a la playa.', 'category': 'Paletas'},
-    'Paleta de Queso': {'name': 'Paleta de Queso', 'price': '$25', 'image': 'Pqueso.png', 'justification': 'Cremosa y dulce, una combinación inesperada que encanta.', 'category': 'Paletas'},
-    'Paleta de Cajeta ': {'name': 'Paleta de Cajeta ', 'price': '$25', 'image': 'Pcajeta.png', 'justification': 'Un clásico mexicano, dulce y cremoso con sabor a leche quemada.', 'category': 'Paletas'},
-    'Paleta de Uva ': {'name': 'Paleta de Uva ', 'price': '$25', 'image': 'Puva.png', 'justification': 'Dulce y jugosa, perfecta para el antojo de fruta.', 'category': 'Paletas'},
-    'Paleta de Aroz c/Leche ': {'name': 'Paleta de Aroz c/Leche ', 'price': '$25', 'image': 'Parroz.png', 'justification': 'El postre casero convertido en paleta, cremosa y reconfortante.', 'category': 'Paletas'},
-    'Paleta de Fresas c/Crema': {'name': 'Paleta de Fresas c/Crema', 'price': '$25', 'image': 'Pfresascrema.png', 'justification': 'La mezcla perfecta de fruta dulce y cremosidad.', 'category': 'Paletas'},
-    'Paleta de Chocolate': {'name': 'Paleta de Chocolate', 'price': '$25', 'image': 'Pchocolate.png', 'justification': 'Un clásico irresistible, dulce y profundo sabor a cacao.', 'category': 'Paletas'},
-    'Paleta de Tamarindo': {'name': 'Paleta de Tamarindo', 'price': '$25', 'image': 'Ptamarindo.png', 'justification': 'Ácida y un poco dulce, sabor tradicional que despierta.', 'category': 'Paletas'},
-    'Paleta de Nuez': {'name': 'Paleta de Nuez', 'price': '$25', 'image': 'Pnuez.png', 'justification': 'Cremosa, dulce y con trocitos de nuez, ideal para un antojo completo.', 'category': 'Paletas'},
-    'Paleta de Mango': {'name': 'Paleta de Mango', 'price': '$25', 'image': 'Pmango.png', 'justification': 'El sabor tropical por excelencia, dulce y vibrante.', 'category': 'Paletas'},
-    'Paleta de Coco': {'name': 'Paleta de Coco', 'price': '$25', 'image': 'Pcoco.png', 'justification': 'Exótica y cremosa, te hará sentir en el paraíso.', 'category': 'Paletas'},
-    'Paleta de Fresa ': {'name': 'Paleta de Fresa ', 'price': '$25', 'image': 'Pfresa.png', 'justification': 'Sabor dulce y clásico, una opción que nunca falla.', 'category': 'Paletas'},
-    'Paleta de Limon ': {'name': 'Paleta de Limon ', 'price': '$25', 'image': 'Plimon.png', 'justification': 'Extremadamente refrescante y ácida, el mejor remedio para el calor.', 'category': 'Paletas'},
-    'Paleta de Naranja ': {'name': 'Paleta de Naranja ', 'price': '$25', 'image': 'Pnaranja.png', 'justification': 'Cítrica y dulce, como un rayo de sol refrescante.', 'category': 'Paletas'},
-    'Paleta de Chicle': {'name': 'Paleta de Chicle', 'price': '$25', 'image': 'Pchicle.png', 'justification': 'Divertida y dulce, perfecta para un gusto original.', 'category': 'Paletas'},
-
-    #...........................................HELADOS...........................#
-    'Helado de Frutos': {'name': 'Helado de Frutos', 'price': '$35', 'image': 'HAfrutos.png', 'justification': 'Nieve de sabores de bosque, ligera y ligeramente ácida.', 'category': 'Helados'},
-    'Helado de Kiwi': {'name': 'Helado de Kiwi', 'price': '$35', 'image': 'HAkiwi.png', 'justification': 'Nieve exótica y refrescante con un toque ácido.', 'category': 'Helados'},
-    'Helado de Limon': {'name': 'Helado de Limon', 'price': '$35', 'image': 'HAlimon.png', 'justification': 'Nieve ácida y potente, el sabor más refrescante.', 'category': 'Helados'},
-    'Helado de Mango': {'name': 'Helado de Mango', 'price': '$35', 'image': 'HAmango.png', 'justification': 'Nieve de mango tropical, dulce y con cuerpo.', 'category': 'Helados'},
-    'Helado de Piña': {'name': 'Helado de Piña', 'price': '$35', 'image': 'HApiña.png', 'justification': 'Nieve de piña, un sabor tropical y ligeramente ácido.', 'category': 'Helados'},
-    'Helado de Beso de angel': {'name': 'Helado de Beso de angel', 'price': '$35', 'image': 'HLbesoangel.png', 'justification': 'Cremoso, dulce y suave, una delicia celestial.', 'category': 'Helados'},
-    'Helado de Cafe': {'name': 'Helado de Cafe', 'price': '$35', 'image': 'HLcafe.png', 'justification': 'Un postre cremoso con el toque amargo y estimulante del café.', 'category': 'Helados'},
-    'Helado de Chocolate': {'name': 'Helado de Chocolate', 'price': '$35', 'image': 'HLchocolate.png', 'justification': 'El clásico cremoso y rico en cacao, perfecto para los amantes del dulce.', 'category': 'Helados'},
-    'Helado de Chocomenta': {'name': 'Helado de Chocomenta', 'price': '$35', 'image': 'HLchocomenta.png', 'justification': 'La frescura de la menta con la cremosidad del chocolate.', 'category': 'Helados'},
-    'Helado de Coco': {'name': 'Helado de Coco', 'price': '$35', 'image': 'HLcoco.png', 'justification': 'Cremoso y tropical, con trocitos de coco real.', 'category': 'Helados'},
-    'Helado de Fresa': {'name': 'Helado de Fresa', 'price': '$35', 'image': 'HLfresa.png', 'justification': 'Helado cremoso con el sabor dulce y natural de la fresa.', 'category': 'Helados'},
-    'Helado de Fresas c/Crema': {'name': 'Helado de Fresas c/Crema', 'price': '$35', 'image': 'HLfresascrema.png', 'justification': 'El postre clásico en helado, dulce y muy cremoso.', 'category': 'Helados'},
-    'Helado de Oreo ': {'name': 'Helado de Oreo ', 'price': '$35', 'image': 'HLoreo.png', 'justification': 'Cremoso y lleno de trocitos de galleta, un postre delicioso.', 'category': 'Helados'},
-    'Helado de Pay de limon': {'name': 'Helado de Pay de limon', 'price': '$35', 'image': 'HLpaylimon.png', 'justification': 'Dulce y ácido, con sabor a postre casero.', 'category': 'Helados'},
-    'Helado de Vainilla': {'name': 'Helado de Vainilla', 'price': '$35', 'image': 'HLvainilla.png', 'justification': 'El helado más versátil y cremoso, un deleite clásico.', 'category': 'Helados'},
-    'Helado de Zarzamora c/Queso ': {'name': 'Helado de Zarzamora c/Queso ', 'price': '$35', 'image': 'HLzarzamoraqueso.png', 'justification': 'La acidez de la zarzamora equilibrada con la cremosidad del queso.', 'category': 'Helados'},
-    'Helado de Pistache': {'name': 'Helado de Pistache', 'price': '$35', 'image': 'HLpistache.png', 'justification': 'Helado con el sabor delicado y único del pistache.', 'category': 'Helados'},
-    'Helado de Ferrero': {'name': 'Helado de Ferrero', 'price': '$35', 'image': 'HLferrero.png', 'justification': 'Una experiencia de sabor a chocolate y avellanas.', 'category': 'Helados'},
-    'Bola EXTRA': {'name': 'Bola EXTRA', 'price': '$10', 'image': 'extra.png', 'justification': 'Una bola extra de tu sabor favorito para completar tu antojo.', 'category': 'Helados'},
-
-    #...........................................AGUAS...........................#
-    'Agua CH de Frutas ': {'name': 'Agua CH de Frutas ', 'price': '$25', 'image': 'Afrutasm.png', 'justification': 'Agua fresca de frutas naturales en tamaño chico, dulce y revitalizante.', 'category': 'Aguas'},
-    'Agua CH de Horchata': {'name': 'Agua CH de Horchata', 'price': '$25', 'image': 'Ahorchatam.png', 'justification': 'Agua chica de horchata, cremosa, dulce y refrescante.', 'category': 'Aguas'},
-    'Agua CH de Chia con limon': {'name': 'Agua CH de Chia con limon', 'price': '$25', 'image': 'Achiam.png', 'justification': 'Agua chica de chía con limón, ácida e hidratante.', 'category': 'Aguas'},
-    'Agua CH de Coco c/Nuez': {'name': 'Agua CH de Coco c/Nuez', 'price': '$25', 'image': 'Acocom.png', 'justification': 'Agua chica de coco con nuez, dulce y con textura.', 'category': 'Aguas'},
-    'Agua CH de Jamaica': {'name': 'Agua CH de Jamaica', 'price': '$25', 'image': 'Ajamaicam.png', 'justification': 'Agua chica de jamaica, ácida y con un toque floral.', 'category': 'Aguas'},
-    'Agua CH de Piña colada': {'name': 'Agua CH de Piña colada', 'price': '$25', 'image': 'Apiñam.png', 'justification': 'Agua chica con sabor a piña colada, tropical y cremosa.', 'category': 'Aguas'},
-    'Agua CH de Cafe': {'name': 'Agua CH de Cafe', 'price': '$25', 'image': 'Acafem.png', 'justification': 'Agua chica de café, la energía que necesitas para seguir.', 'category': 'Aguas'},
-    'Agua CH de Citricos': {'name': 'Agua CH de Citricos', 'price': '$25', 'image': 'Acitricosm.png', 'justification': 'Agua chica de cítricos, una explosión de sabor ácido y refrescante.', 'category': 'Aguas'},
-    'Agua G de Frutas ': {'name': 'Agua G de Frutas ', 'price': '$35', 'image': 'Afrutasg.png', 'justification': 'Agua fresca de frutas naturales en tamaño grande, ideal para compartir.', 'category': 'Aguas'},
-    'Agua G de Horchata': {'name': 'Agua G de Horchata', 'price': '$35', 'image': 'Ahorchatag.png', 'justification': 'Agua grande de horchata, el clásico cremoso en su mejor versión.', 'category': 'Aguas'},
-    'Agua G de Chia con limon': {'name': 'Agua G de Chia con limon', 'price': '$35', 'image': 'Achiag.png', 'justification': 'Agua grande de chía con limón, la opción más saludable y refrescante.', 'category': 'Aguas'},
-    'Agua G de Coco c/Nuez': {'name': 'Agua G de Coco c/Nuez', 'price': '$35', 'image': 'Acocog.png', 'justification': 'Agua grande de coco con nuez, perfecta para un antojo grande y tropical.', 'category': 'Aguas'},
-    'Agua G de Jamaica': {'name': 'Agua G de Jamaica', 'price': '$35', 'image': 'Ajamaicag.png', 'justification': 'Agua grande de jamaica, ideal para apagar la sed con un sabor potente.', 'category': 'Aguas'},
-    'Agua G de Piña colada': {'name': 'Agua G de Piña colada', 'price': '$35', 'image': 'Apiñag.png', 'justification': 'Agua grande con sabor a piña colada, sabor a vacaciones.', 'category': 'Aguas'},
-    'Agua G de Cafe': {'name': 'Agua G de Cafe', 'price': '$35', 'image': 'Acafeg.png', 'justification': 'Agua grande de café, para los que necesitan un extra de energía y sabor.', 'category': 'Aguas'},
-    'Agua G de Citricos': {'name': 'Agua G de Citricos', 'price': '$35', 'image': 'Acitricosg.png', 'justification': 'Agua grande de cítricos, refrescante y con vitaminas.', 'category': 'Aguas'},
-
-    #....................................ESPECIALIDADES...........................#
-    'Fresas c/Crema': {'name': 'Fresas c/Crema', 'price': '$45', 'image': 'fresascrema.png', 'justification': 'El postre favorito, fresas frescas con una crema dulce y suave.', 'category': 'Especialidades'},
-    'Frappe de Oreo': {'name': 'Frappe de Oreo', 'price': '$40', 'image': 'frappeoreo.png', 'justification': 'Bebida helada, cremosidad y trozos de galleta Oreo.', 'category': 'Especialidades'},
-    'Banana Split': {'name': 'Banana Split', 'price': '$42', 'image': 'bananasplit.png', 'justification': 'Plátano dividido con helado, crema y tus toppings favoritos.', 'category': 'Especialidades'},
-    'Copa de helado Choco': {'name': 'Copa de helado Choco', 'price': '$55', 'image': 'chchocolate.png', 'justification': 'Helado de chocolate en copa con jarabe y chispas, un clásico.', 'category': 'Especialidades'},
-    'Copa de helado Napolitano': {'name': 'Copa de helado Napolitano', 'price': '$56', 'image': 'chnapolitano.png', 'justification': 'Una copa con los tres sabores clásicos: vainilla, fresa y chocolate.', 'category': 'Especialidades'},
-    'Mangonada': {'name': 'Mangonada', 'price': '$35', 'image': 'mangonada.png', 'justification': 'Dulce, ácido y picante. Mango con chamoy y chile, ¡una explosión de sabor!', 'category': 'Especialidades'},
-    'Chocobana': {'name': 'Chocobana', 'price': '$24', 'image': 'chocobana.png', 'justification': 'Plátano congelado cubierto con una capa crujiente de chocolate.', 'category': 'Especialidades'},
-    'Sandiwch Helado ': {'name': 'Sandiwch Helado ', 'price': '$25', 'image': 'sandi.png', 'justification': 'Helado entre dos galletas, un postre cremoso y fácil de llevar.', 'category': 'Especialidades'},
-    'Canasta de Helado': {'name': 'Canasta de Helado', 'price': '$60', 'image': 'canasta.png', 'justification': 'Tu elección de helado servido en una canasta de waffle crujiente.', 'category': 'Especialidades'},
-    'Frape de fresa': {'name': 'Frape de fresa', 'price': '$40', 'image': 'frappefresa.png', 'justification': 'Bebida helada y cremosa con el dulce sabor de la fresa.', 'category': 'Especialidades'},
-    'Paleta preparada': {'name': 'Paleta preparada', 'price': '$35', 'image': 'ppreparada.png', 'justification': 'Cualquier paleta bañada en chile, chamoy o limón, ¡personaliza tu antojo!', 'category': 'Especialidades'},
-    'Malteadas': {'name': 'Malteadas', 'price': '$65', 'image': 'malteadas.png', 'justification': 'Bebida espesa y cremosa, elige tu sabor favorito y disfrútala.', 'category': 'Especialidades'},
+        load_start = time.perf_counter()
+        artifact = train_model.load_published_artifact(train_model.MODEL_FILE_PATH)
+        if artifact is not None:
+            bundle = ModelBundle(artifact, signature)
+            registry.inc('model_loads_total', source='hot_swap')
+            registry.inc('model_load_seconds_total', time.perf_counter() - load_start, source='hot_swap')
+    except Exception:
+        app.logger.exception('No se pudo recargar el modelo')
+    finally:
+        _reload_lock.release()
+
+def current_bundle():
+    global _next_reload_check
+    now = time.monotonic()
+    if now >= _next_reload_check:
+        _next_reload_check = now + MODEL_RELOAD_INTERVAL
+        signature = _artifact_signature(train_model.MODEL_FILE_PATH)
+        if signature is not None and signature != bundle.signature and _reload_lock.acquire(blocking=False):
+            threading.Thread(target=_reload_bundle, args=(signature,), daemon=True).start()
+    return bundle
+
+# --- Reentrenamiento en segundo plano ---
+# Las ventas nuevas se agregan al CSV y el reentrenamiento corre en otro proceso
+# (nunca bloquea a los workers). Si llegan más ventas mientras tanto, se vuelve a
+# entrenar al terminar. El proceso hijo vive solo lo que dura el reentrenamiento:
+# uno ocioso por worker, con pandas y scikit-learn cargados, anularía el ahorro de
+# memoria de cargar el modelo una sola vez.
+_retrain_lock = threading.RLock()
+_retrain_future = None
+_retrain_pending = False
+
+def schedule_retrain():
+    global _retrain_future, _retrain_pending
+    with _retrain_lock:
+        if _retrain_future is not None and not _retrain_future.done():
+            _retrain_pending = True
+            return
+        # 'spawn': el proceso hijo no hereda los hilos ni los sockets del worker
+        pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        _retrain_future = pool.submit(train_model.retrain, train_model.find_data_file())
+        _retrain_future.add_done_callback(functools.partial(_retrain_done, pool))
+
+def _retrain_done(pool, future):
+    global _retrain_pending, _next_reload_check
+    # Sin esperar: el hijo ya terminó su única tarea y sale solo
+    pool.shutdown(wait=False)
+    try:
+        summary = future.result()
+        registry.inc('model_retrains_total', result='trained' if summary['retrained'] else 'up_to_date')
+        if summary['retrained']:
+            registry.inc('model_retrain_seconds_total', summary['train_seconds'])
+        # Revisar el artefacto nuevo en la siguiente petición
+        _next_reload_check = 0
+    except Exception:
+        registry.inc('model_retrains_total', result='error')
+        app.logger.exception('Falló el reentrenamiento en segundo plano')
+    with _retrain_lock:
+        pending, _retrain_pending = _retrain_pending, False
+    if pending:
+        schedule_retrain()
+
+# --- Funciones de Utilidad ---
+# Usa la API Key del entorno o la que tenías por defecto
+WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY', 'cee0d3d67f8dfd9ff7e84d1f849c884e')
+weather_provider = weather.provider_from_env(WEATHER_API_KEY, registry=registry)
+
+def get_weather_data(city):
+    # Nunca bloquea: devuelve el clima en caché y lo refresca en segundo plano
+    return weather_provider.get(city)
+
+def report_unknown_answers(unknown_rows, endpoint):
+    # Respuestas que el modelo nunca vio al entrenar: se predice sin ellas, pero se
+    # cuentan por campo y se registran (una línea por bloque) para agregarlas al CSV
+    if not unknown_rows:
+        return
+    values = set()
+    for _, unknown in unknown_rows:
+        for field, value in unknown.items():
+            registry.inc('recommend_unknown_answers_total', endpoint=endpoint, field=field)
+            values.add(f"{field}={value!r}")
+    app.logger.warning('%d cuestionario(s) con respuestas desconocidas para el modelo: %s',
+                       len(unknown_rows), ', '.join(sorted(values)))
+
+def parse_k(value):
+    k = int(value)
+    if k < 1:
+        raise ValueError('k debe ser mayor o igual a 1')
+    return min(k, MAX_K)
+
+# --- Recursos estáticos ---
+# Si existe static/dist/manifest.json (python assets.py), las imágenes, el CSS y el
+# JS se sirven desde /assets con el hash en el nombre; si no, desde /static como antes.
+ASSET_MAX_AGE = 365 * 24 * 3600
+asset_manifest = assets.Manifest.load()
+
+# Cada producto tal como va en las respuestas: con image_url (y variantes AVIF/WebP)
+PRODUCT_RESPONSES = {
+    p_id: {**p_info, **asset_manifest.image_fields(p_info['image'])}
+    for p_id, p_info in PRODUCTS_DB.items()
 }
 
+@app.context_processor
+def inject_asset_url():
+    return {'asset_url': asset_manifest.asset_url}
+
+# --- Recomendación por lotes ---
+# Para kioscos y procesos nocturnos: un solo clima, una sola matriz codificada y una
+# sola llamada a predict_proba por bloque de cuestionarios.
+BATCH_CHUNK_SIZE = int(os.environ.get('BATCH_CHUNK_SIZE', '1000'))
+
+class InvalidQuestionnaire:
+    """Línea NDJSON que no se pudo leer; se reporta como error en su posición."""
+
+    def __init__(self, error):
+        self.error = error
+
+def _parse_ndjson(lines):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield InvalidQuestionnaire(f'JSON inválido: {e}')
+
+def questionnaire_answers(client_data):
+    """Devuelve (respuestas, None) si el cuestionario es válido, o (None, error).
+
+    Cada respuesta debe ser texto no vacío: cualquier otro tipo (listas, números)
+    haría fallar al codificador o a la comparación de categorías.
+    """
+    if not isinstance(client_data, dict):
+        return None, 'El cuestionario debe ser un objeto JSON'
+    client_responses = {f: client_data.get(f) for f in features[:-1]}
+    missing = [f for f, v in client_responses.items() if v is None or v == '']
+    if missing:
+        return None, 'Faltan respuestas necesarias del cuestionario'
+    invalid = [f for f, v in client_responses.items() if not isinstance(v, str) or not v.strip()]
+    if invalid:
+        return None, f"Respuestas inválidas (deben ser texto no vacío): {', '.join(invalid)}"
+    return client_responses, None
+
+def _result(ranking, current_weather):
+    recommended_product = PRODUCT_RESPONSES.get(ranking[0]) if ranking else None
+    if not recommended_product:
+        return {'error': f'Producto predicho ({ranking[0] if ranking else None}) no encontrado en la base de datos'}
+    result = {'recommended_product': recommended_product, 'weather': current_weather}
+    if len(ranking) > 1:
+        result['alternatives'] = [PRODUCT_RESPONSES[p_id] for p_id in ranking[1:] if p_id in PRODUCT_RESPONSES]
+    return result
+
+def _recommend_chunk(model_bundle, start_index, questionnaires, current_weather, k):
+    results = [None] * len(questionnaires)
+    valid_rows, valid_records = [], []
+    for i, client_data in enumerate(questionnaires):
+        if isinstance(client_data, InvalidQuestionnaire):
+            results[i] = {'index': start_index + i, 'error': client_data.error}
+            continue
+        client_responses, error = questionnaire_answers(client_data)
+        if error:
+            results[i] = {'index': start_index + i, 'error': error}
+        else:
+            valid_rows.append(i)
+            valid_records.append(dict(client_responses, weather=current_weather))
+
+    if valid_records:
+        with registry.time('recommend_stage_seconds', endpoint='batch', stage='encode'):
+            # Igual que en /recommend: las respuestas desconocidas quedan en ceros
+            encoded, unknown_rows = model_bundle.feature_encoder.encode_many(valid_records, strict=False)
+        report_unknown_answers(unknown_rows, endpoint='batch')
+        with registry.time('recommend_stage_seconds', endpoint='batch', stage='predict'):
+            probabilities = model_bundle.model.predict_proba(encoded)
+        with registry.time('recommend_stage_seconds', endpoint='batch', stage='rank'):
+            chosen_types = [r['tipo_producto_general'] for r in valid_records]
+            rankings, corrected = model_bundle.rank_products(probabilities, chosen_types, k)
+        registry.inc('recommend_coherence_correction_total', sum(corrected), endpoint='batch')
+
+        for i, ranking in zip(valid_rows, rankings):
+            results[i] = {'index': start_index + i, **_result(ranking, current_weather)}
+    return results
+
+def recommend_batch(questionnaires, current_weather=None, k=1, chunk_size=BATCH_CHUNK_SIZE):
+    """Genera una recomendación por cuestionario, en orden; no necesita Flask.
+
+    ``questionnaires`` puede ser cualquier iterable de dicts (incluso un generador
+    que lee de disco): se procesa en bloques de ``chunk_size`` sin cargarlo entero.
+    """
+    if current_weather is None:
+        with registry.time('recommend_stage_seconds', endpoint='batch', stage='weather'):
+            current_weather = get_weather_data(CITY)
+    # Todo el lote se atiende con el mismo modelo aunque se recargue a la mitad
+    model_bundle = current_bundle()
+    questionnaires = iter(questionnaires)
+    start_index = 0
+    while True:
+        chunk = list(itertools.islice(questionnaires, chunk_size))
+        if not chunk:
+            return
+        yield from _recommend_chunk(model_bundle, start_index, chunk, current_weather, k)
+        start_index += len(chunk)
+
 # --- Rutas de Flask ---
 @app.route('/')
 def index():
@@ -152,64 +419,167 @@ def questionnaire():
 
 @app.route('/recommend', methods=['POST'])
 def recommend():
+    request_start = time.perf_counter()
+    # Los errores del cliente (cuerpo que no es JSON, respuestas que no son texto, k
+    # inválido) se responden con 400 antes del try: recommend_errors_total solo
+    # debe contar fallas del servidor
+    client_data = request.get_json(silent=True)
+    client_responses, error = questionnaire_answers(client_data)
+    if error:
+        return jsonify({'error': error}), 400
     try:
-        client_data = request.json
-        client_responses = {
-            'tipo_producto_general': client_data.get('tipo_producto_general'),
-            'tipo_antojo': client_data.get('tipo_antojo'),
-            'base': client_data.get('base'),
-            'tipo_sabor': client_data.get('tipo_sabor')
-        }
-
-        if not all(client_responses.values()):
-            return jsonify({'error': 'Faltan respuestas necesarias del cuestionario'}), 400
-
-        # Usa la API Key del entorno o la que tenías por defecto
-        api_key = os.environ.get('WEATHER_API_KEY', 'cee0d3d67f8dfd9ff7e84d1f849c884e')
-        city = 'Mexico City'
-        current_weather = get_weather_data(api_key, city)
-        
-        # 1. Preparar la entrada para la IA
-        input_data = pd.DataFrame([client_responses], columns=features)
-        input_data['weather'] = current_weather
-        
-        # 2. Codificar y reindexar (crucial para que coincidan las columnas del entrenamiento)
-        input_data_encoded = pd.get_dummies(input_data)
-        input_data_encoded = input_data_encoded.reindex(columns=X.columns, fill_value=0)
-        
-        # 3. Predecir
-        try:
-             recommended_product_id = model.predict(input_data_encoded)[0]
-        except ValueError:
-             # Si falla la predicción (columnas nuevas o datos raros), elige un producto al azar
-             recommended_product_id = random.choice(list(PRODUCTS_DB.keys()))
+        k = parse_k(client_data.get('k', 1))
+    except (TypeError, ValueError):
+        return jsonify({'error': f'Valor de k inválido (entre 1 y {MAX_K})'}), 400
 
-        # 4. Chequeo de Coherencia (si el producto no coincide con la categoría elegida)
+    try:
+        with registry.time('recommend_stage_seconds', endpoint='single', stage='weather'):
+            current_weather = get_weather_data(CITY)
         chosen_product_type = client_responses['tipo_producto_general']
-        predicted_product_category = PRODUCTS_DB.get(recommended_product_id, {}).get('category', '')
-        
-        # Lógica de corrección: se eliminan las 's' para comparar singular vs plural (Paleta vs Paletas)
-        if chosen_product_type.lower().replace('s', '') not in predicted_product_category.lower().replace('s', ''):
-            coherent_products = [
-                p_id for p_id, p_info in PRODUCTS_DB.items()
-                if chosen_product_type.lower().replace('s', '') in p_info['category'].lower().replace('s', '')
-            ]
-            if coherent_products:
-                recommended_product_id = random.choice(coherent_products)
-
-        recommended_product = PRODUCTS_DB.get(recommended_product_id)
-
-        if recommended_product:
-            return jsonify({
-                'recommended_product': recommended_product,
-                'weather': current_weather
-            })
+        corrected = False
+        model_bundle = current_bundle()
+
+        # 0. Buscar la combinación de respuestas en la tabla precalculada
+        answer_key = tuple(client_responses[f] for f in features[:-1]) + (current_weather,)
+        if answer_key in model_bundle.lookup_table:
+            registry.inc('recommend_lookup_total', result='hit')
+            with registry.time('recommend_stage_seconds', endpoint='single', stage='lookup'):
+                ranking, corrected = model_bundle.ranked_from_table(answer_key, k)
+                ranking = list(ranking)
         else:
-            return jsonify({'error': f'Producto predicho ({recommended_product_id}) no encontrado en la base de datos'}), 404
+            registry.inc('recommend_lookup_total', result='miss')
+            # 1. Preparar la entrada para la IA
+            input_data = dict(client_responses, weather=current_weather)
+
+            try:
+                 # 2. Codificar con las mismas columnas del entrenamiento. Una respuesta
+                 # que no aparece en el CSV (p. ej. 'picante') queda con su campo en ceros,
+                 # igual que con get_dummies + reindex, y se predice con el resto
+                 with registry.time('recommend_stage_seconds', endpoint='single', stage='encode'):
+                     input_data_encoded, unknown_rows = model_bundle.feature_encoder.encode_many([input_data], strict=False)
+                 report_unknown_answers(unknown_rows, endpoint='single')
+
+                 # 3. Predecir y ordenar dentro de la categoría elegida (chequeo de coherencia)
+                 with registry.time('recommend_stage_seconds', endpoint='single', stage='predict'):
+                     probabilities = model_bundle.model.predict_proba(input_data_encoded)
+                 with registry.time('recommend_stage_seconds', endpoint='single', stage='rank'):
+                     rankings, corrections = model_bundle.rank_products(probabilities, [chosen_product_type], k)
+                 ranking, corrected = rankings[0], corrections[0]
+            except ValueError:
+                 # Si falla la predicción (datos raros), elige al azar
+                 registry.inc('recommend_random_fallback_total', endpoint='single')
+                 ranking = model_bundle.random_ranking(chosen_product_type, k)
+
+        if corrected:
+            registry.inc('recommend_coherence_correction_total', endpoint='single')
+        registry.observe('recommend_request_seconds', time.perf_counter() - request_start, endpoint='single')
+        result = _result(ranking, current_weather)
+        if 'error' in result:
+            return jsonify(result), 404
+        return jsonify(result)
 
     except Exception as e:
         # Esto captura cualquier error interno y lo devuelve al cliente para debug
+        registry.inc('recommend_errors_total', endpoint='single')
+        app.logger.exception('Error al recomendar')
         return jsonify({'error': str(e)}), 500
 
+@app.route('/recommend/batch', methods=['POST'])
+def recommend_batch_route():
+    # Acepta un JSON ({"questionnaires": [...]} o una lista) o NDJSON, un cuestionario por línea
+    if request.mimetype == 'application/x-ndjson':
+        # Cada línea se lee por separado: una línea mal formada no corta el resto
+        questionnaires = _parse_ndjson(request.stream)
+    else:
+        body = request.get_json(silent=True)
+        questionnaires = body.get('questionnaires') if isinstance(body, dict) else body
+        if not isinstance(questionnaires, list):
+            return jsonify({'error': 'Se esperaba una lista de cuestionarios'}), 400
+
+    try:
+        k = parse_k(request.args.get('k', 1))
+    except ValueError:
+        return jsonify({'error': f'Valor de k inválido (entre 1 y {MAX_K})'}), 400
+
+    def generate():
+        try:
+            for result in recommend_batch(questionnaires, k=k):
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+        except Exception as e:
+            # La respuesta ya empezó: el error se reporta como una línea más
+            registry.inc('recommend_errors_total', endpoint='batch')
+            app.logger.exception('Error al recomendar por lotes')
+            yield json.dumps({'error': str(e)}, ensure_ascii=False) + '\n'
+
+    # La respuesta se transmite línea por línea para no acumular lotes grandes en memoria
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+MAX_SALES_PER_REQUEST = int(os.environ.get('MAX_SALES_PER_REQUEST', '1000'))
+
+@app.route('/sales', methods=['POST'])
+def ingest_sales():
+    # La ingesta modifica el CSV y dispara reentrenamientos: sin INGEST_TOKEN queda desactivada
+    ingest_token = os.environ.get('INGEST_TOKEN')
+    if not ingest_token:
+        return jsonify({'error': 'La ingesta de ventas está desactivada (falta INGEST_TOKEN)'}), 403
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {ingest_token}'):
+        return jsonify({'error': 'No autorizado'}), 401
+
+    body = request.get_json(silent=True)
+    records = [body] if isinstance(body, dict) else body
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': 'Se esperaba una venta o una lista de ventas'}), 400
+    if len(records) > MAX_SALES_PER_REQUEST:
+        return jsonify({'error': f'Máximo {MAX_SALES_PER_REQUEST} ventas por petición'}), 413
+
+    sales = []
+    for i, record in enumerate(records):
+        try:
+            sales.append(train_model.validate_sale(record, known_products=PRODUCTS_DB, answer_options=ANSWER_OPTIONS))
+        except ValueError as e:
+            return jsonify({'error': f'Venta {i}: {e}'}), 400
+
+    try:
+        train_model.append_sales(sales, train_model.find_data_file())
+    except OSError as e:
+        # Por ejemplo, un sistema de archivos de solo lectura (Vercel)
+        return jsonify({'error': f'No se pudieron guardar las ventas: {e}'}), 503
+    registry.inc('sales_ingested_total', len(sales))
+
+    schedule_retrain()
+    return jsonify({'accepted': len(sales), 'retraining': True}), 202
+
+@app.route(assets.ASSETS_URL_PATH + '/<path:filename>')
+def hashed_asset(filename):
+    # Solo archivos generados por el build: el hash en el nombre es el ETag, y como
+    # el contenido no cambia nunca se pueden guardar en caché sin revalidar
+    content_hash = assets.hash_from_name(filename)
+    if content_hash is None:
+        abort(404)
+    gzip_path = os.path.join(assets.DIST_DIR, filename + '.gz')
+    precompressed = os.path.isfile(gzip_path)
+    if precompressed and 'gzip' in request.accept_encodings:
+        response = send_from_directory(assets.DIST_DIR, filename + '.gz', mimetype=mimetypes.guess_type(filename)[0],
+                                       etag=f"{content_hash}-gzip", max_age=ASSET_MAX_AGE)
+        response.content_encoding = 'gzip'
+    else:
+        response = send_from_directory(assets.DIST_DIR, filename, etag=content_hash, max_age=ASSET_MAX_AGE)
+    if precompressed:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/metrics')
+def metrics():
+    # Suma las métricas de todos los workers (ver metrics.py)
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.after_request
+def record_request(response):
+    if request.endpoint in ('recommend', 'recommend_batch_route', 'ingest_sales'):
+        registry.inc('http_requests_total', endpoint=request.endpoint, status=str(response.status_code))
+    registry.maybe_flush()
+    return response
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,286 @@
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+
+# --- Recursos estáticos optimizados ---
+# `python assets.py` genera static/dist/ a partir de static/:
+#   - imágenes redimensionadas en AVIF y WebP (más un PNG/JPEG optimizado de respaldo),
+#   - CSS y JS con el hash del contenido en el nombre y una copia .gz precomprimida,
+#   - static/dist/manifest.json, que traduce cada ruta original a su versión con hash.
+# Como el nombre cambia cuando cambia el contenido, el servidor puede mandarlos con
+# caché "immutable" y el kiosco no los vuelve a descargar.
+#
+# Pillow solo hace falta para construir (requirements-dev.txt); el servidor solo lee
+# el manifiesto y, si no existe, sigue sirviendo los archivos originales de static/.
+#
+# static/dist/ se versiona en git y se despliega tal cual, igual que modelo_ia.pkl:
+# ni Vercel ni el Procfile corren un paso de build. Al cambiar algo en static/
+# (imágenes, CSS, JS) o en PRODUCTS_DB hay que regenerarlo y subirlo con el cambio:
+#   python assets.py --clean --allow-missing
+# El build es determinista: sin cambios en static/ no cambia ningún archivo.
+#
+# Uso:
+#   python assets.py                    # falla si PRODUCTS_DB apunta a imágenes que no existen
+#   python assets.py --allow-missing    # solo avisa de las imágenes faltantes
+#   python assets.py --clean ...        # borra antes los archivos de builds anteriores
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+STATIC_URL_PATH = '/static'
+ASSETS_URL_PATH = '/assets'
+
+IMAGE_WIDTHS = (480, 960)
+RESIZABLE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+HASH_LENGTH = 12
+_HASH_IN_NAME = re.compile(r'\.([0-9a-f]{%d})\.[A-Za-z0-9]+$' % HASH_LENGTH)
+_CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+class MissingImagesError(Exception):
+    """PRODUCTS_DB referencia imágenes que no existen en static/images."""
+
+    def __init__(self, missing):
+        super().__init__(', '.join(missing))
+        self.missing = missing
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hash_from_name(filename):
+    """Devuelve el hash incluido en un nombre generado por el build, o None."""
+    match = _HASH_IN_NAME.search(filename)
+    return match.group(1) if match else None
+
+
+class Manifest:
+    """Traducción de rutas de static/ a sus versiones con hash en static/dist/."""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.assets = data.get('assets', {})  # 'css/style.css' -> 'css/style.<hash>.css'
+        self.images = data.get('images', {})  # 'foto.png' -> respaldo y variantes por formato
+
+    @classmethod
+    def load(cls, path=MANIFEST_PATH):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls(json.load(f))
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            print(f"No se pudo leer el manifiesto de recursos ({e}), se usarán los originales.")
+            return cls()
+
+    def asset_url(self, path):
+        hashed = self.assets.get(path)
+        if hashed is None:
+            return f"{STATIC_URL_PATH}/{path}"
+        return f"{ASSETS_URL_PATH}/{hashed}"
+
+    def image_fields(self, image):
+        """Campos de imagen que se agregan a cada producto en las respuestas JSON."""
+        entry = self.images.get(image)
+        if entry is None:
+            return {'image_url': f"{STATIC_URL_PATH}/images/{image}"}
+        return {
+            'image_url': f"{ASSETS_URL_PATH}/{entry['fallback']}",
+            'image_sources': [
+                {'type': mimetype, 'srcset': ', '.join(f"{ASSETS_URL_PATH}/{path} {width}w" for path, width in variants)}
+                for mimetype, variants in entry['sources']
+            ],
+        }
+
+
+# --- Build ---
+
+def _hashed_path(relpath, data, label=None, extension=None):
+    root, original_extension = os.path.splitext(relpath)
+    if label:
+        root = f"{root}.{label}"
+    return f"{root}.{content_hash(data)}{extension or original_extension}"
+
+
+def _write(out_dir, relpath, data, compress=False):
+    path = os.path.join(out_dir, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if compress:
+        # mtime=0 para que el .gz sea idéntico entre builds
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            with open(path + '.gz', 'wb') as f:
+                f.write(compressed)
+    return len(data)
+
+
+def _encode(image, image_format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def _image_formats():
+    from PIL import features
+    formats = []
+    if features.check('avif'):
+        formats.append(('AVIF', 'image/avif', '.avif', {'quality': 60}))
+    else:
+        print("AVISO: esta versión de Pillow no soporta AVIF, solo se generará WebP.")
+    formats.append(('WEBP', 'image/webp', '.webp', {'quality': 80, 'method': 6}))
+    return formats
+
+
+def _build_image(source_path, name, out_dir, widths, formats):
+    from PIL import Image, ImageOps
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    relpath = f"images/{name}"
+    written = 0
+    sources = {mimetype: [] for _, mimetype, _, _ in formats}
+    for width in sorted({min(w, image.width) for w in widths}):
+        if width == image.width:
+            resized = image
+        else:
+            resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        for image_format, mimetype, extension, options in formats:
+            data = _encode(resized, image_format, **options)
+            variant = _hashed_path(relpath, data, label=width, extension=extension)
+            written += _write(out_dir, variant, data)
+            sources[mimetype].append([variant, width])
+
+    # Respaldo al ancho mayor para navegadores sin AVIF/WebP: PNG solo si hace falta
+    # la transparencia, si no JPEG (mucho más ligero que un PNG de foto)
+    if has_alpha:
+        data, extension = _encode(resized, 'PNG', optimize=True), '.png'
+    else:
+        data, extension = _encode(resized, 'JPEG', quality=85, optimize=True, progressive=True), '.jpg'
+    fallback = _hashed_path(relpath, data, label=width, extension=extension)
+    written += _write(out_dir, fallback, data)
+
+    entry = {
+        'fallback': fallback,
+        'width': resized.width,
+        'height': resized.height,
+        'sources': [[mimetype, variants] for mimetype, variants in sources.items()],
+    }
+    return fallback, entry, written
+
+
+def _rewrite_css_urls(css, css_relpath, assets):
+    base = os.path.dirname(css_relpath)
+
+    def replace(match):
+        quote, ref = match.groups()
+        if ref.startswith(('/', 'data:', '#')) or '://' in ref:
+            return match.group(0)
+        target = os.path.normpath(os.path.join(base, ref)).replace(os.sep, '/')
+        hashed = assets.get(target)
+        if hashed is None:
+            # Sin versión con hash: se sigue pidiendo el original a /static
+            return f"url({quote}{STATIC_URL_PATH}/{target}{quote})"
+        return f"url({quote}{os.path.relpath(hashed, base).replace(os.sep, '/')}{quote})"
+
+    return _CSS_URL.sub(replace, css)
+
+
+def build(product_images, static_dir=STATIC_DIR, out_dir=DIST_DIR, widths=IMAGE_WIDTHS, allow_missing=False):
+    """Genera out_dir y su manifest.json; devuelve el manifiesto como dict.
+
+    Los archivos de builds anteriores no se borran: sus nombres nunca chocan con
+    los nuevos y los clientes con el HTML viejo pueden seguir pidiéndolos.
+    """
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise SystemExit("ERROR: el build de recursos necesita Pillow (pip install Pillow).")
+
+    images_dir = os.path.join(static_dir, 'images')
+    available = set(os.listdir(images_dir)) if os.path.isdir(images_dir) else set()
+    missing = sorted(set(product_images) - available)
+    if missing and not allow_missing:
+        raise MissingImagesError(missing)
+
+    formats = _image_formats()
+    assets, images = {}, {}
+    original_bytes = written_bytes = 0
+    for name in sorted(available):
+        source_path = os.path.join(images_dir, name)
+        if not os.path.isfile(source_path):
+            continue
+        original_bytes += os.path.getsize(source_path)
+        relpath = f"images/{name}"
+        if os.path.splitext(name)[1].lower() in RESIZABLE_EXTENSIONS:
+            assets[relpath], images[name], written = _build_image(source_path, name, out_dir, widths, formats)
+        else:
+            # GIF animados, íconos, etc.: se copian tal cual con hash
+            with open(source_path, 'rb') as f:
+                data = f.read()
+            assets[relpath] = _hashed_path(relpath, data)
+            written = _write(out_dir, assets[relpath], data)
+        written_bytes += written
+
+    # CSS después de las imágenes, para que sus url() apunten a las versiones con hash
+    for subdir, extension in (('css', '.css'), ('js', '.js')):
+        directory = os.path.join(static_dir, subdir)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if os.path.splitext(name)[1] != extension:
+                continue
+            relpath = f"{subdir}/{name}"
+            with open(os.path.join(directory, name), 'rb') as f:
+                data = f.read()
+            original_bytes += len(data)
+            if extension == '.css':
+                data = _rewrite_css_urls(data.decode('utf-8'), relpath, assets).encode('utf-8')
+            assets[relpath] = _hashed_path(relpath, data)
+            written_bytes += _write(out_dir, assets[relpath], data, compress=True)
+
+    manifest = {'assets': assets, 'images': images, 'missing': missing}
+    # El manifiesto va al final y se reemplaza de una vez: nunca apunta a archivos a medio escribir
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_path = os.path.join(out_dir, f"manifest.json.tmp.{os.getpid()}")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(out_dir, 'manifest.json'))
+
+    print(f"{len(assets)} recursos en {out_dir}: {original_bytes / 1e6:.1f} MB originales, "
+          f"{written_bytes / 1e6:.1f} MB generados (todas las variantes).")
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera static/dist con imágenes optimizadas y nombres con hash.')
+    parser.add_argument('--allow-missing', action='store_true',
+                        help='Solo avisa (en vez de fallar) si PRODUCTS_DB referencia imágenes que no existen')
+    parser.add_argument('--clean', action='store_true', help='Borra static/dist antes de generar')
+    args = parser.parse_args()
+
+    from products import PRODUCTS_DB
+    if args.clean:
+        shutil.rmtree(DIST_DIR, ignore_errors=True)
+    try:
+        manifest = build([p['image'] for p in PRODUCTS_DB.values()], allow_missing=args.allow_missing)
+    except MissingImagesError as e:
+        print(f"ERROR: {len(e.missing)} imágenes de PRODUCTS_DB no existen en static/images:")
+        for name in e.missing:
+            print(f"  - {name}")
+        print("Agrega los archivos o corrige PRODUCTS_DB (o usa --allow-missing).")
+        exit(1)
+    if manifest['missing']:
+        print(f"AVISO: {len(manifest['missing'])} imágenes de PRODUCTS_DB no existen y se servirán sin optimizar: "
+              + ', '.join(manifest['missing']))
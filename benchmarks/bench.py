@@ -0,0 +1,357 @@
+"""Benchmarks reproducibles del servicio de recomendación.
+
+Todo corre sin red: el clima viene del backend local (WEATHER_BACKEND=stub).
+
+    python benchmarks/bench.py all --output resultados.json
+    python benchmarks/bench.py startup --repeat 5
+    python benchmarks/bench.py train --rows 10000,100000,1000000
+    python benchmarks/bench.py latency --requests 2000
+    python benchmarks/bench.py load --workers 1,2,4 --concurrency 8 --duration 10
+    python benchmarks/bench.py compare base.json resultados.json --threshold 0.1
+
+Cada métrica se guarda como {"value": ..., "better": "lower" | "higher"} para que
+``compare`` sepa en qué dirección una diferencia es una regresión.
+"""
+import argparse
+import atexit
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# Sin red y sin métricas compartidas con otros procesos
+os.environ['WEATHER_BACKEND'] = 'stub'
+os.environ.pop('METRICS_DIR', None)
+
+# Todos los modos (y los procesos que lanzan) guardan el artefacto del modelo en un
+# directorio temporal: los benchmarks no deben escribir modelo_ia.pkl en el checkout
+SCRATCH_DIR = tempfile.mkdtemp(prefix='michoacana-bench-')
+os.environ['MODEL_FILE_PATH'] = os.path.join(SCRATCH_DIR, 'modelo_ia.pkl')
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {'p50': pick(0.50), 'p90': pick(0.90), 'p99': pick(0.99), 'max': ordered[-1]}
+
+
+def metric(value, better='lower'):
+    return {'value': value, 'better': better}
+
+
+def sample_questionnaires(n, seed=42, unknown_ratio=0.0):
+    """Cuestionarios tomados del espacio de respuestas del modelo (más algunos desconocidos)."""
+    import train_model
+    import pandas as pd
+
+    df = pd.read_csv(train_model.DATA_FILE_PATH)
+    answer_space = [sorted(df[f].dropna().astype(str).unique()) for f in train_model.features[:-1]]
+    combinations = list(itertools.product(*answer_space))
+    rng = random.Random(seed)
+    questionnaires = []
+    for _ in range(n):
+        answers = dict(zip(train_model.features[:-1], rng.choice(combinations)))
+        if rng.random() < unknown_ratio:
+            answers['tipo_antojo'] = 'desconocido'
+        questionnaires.append(answers)
+    return questionnaires
+
+
+# --- Arranque ---
+
+def bench_startup(repeat):
+    """Tiempo de `import app` en un proceso nuevo, con artefacto guardado y sin él."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        warm_artifact = os.path.join(tmp_dir, 'warm.pkl')
+        for mode in ('cold', 'warm'):
+            samples = []
+            for i in range(repeat):
+                env = dict(os.environ, PYTHONWARNINGS='ignore')
+                # cold: una ruta nueva en cada corrida obliga a entrenar
+                env['MODEL_FILE_PATH'] = os.path.join(tmp_dir, f'cold-{i}.pkl') if mode == 'cold' else warm_artifact
+                start = time.perf_counter()
+                subprocess.run([sys.executable, '-c', 'import app'], cwd=ROOT_DIR, env=env,
+                               check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                samples.append(time.perf_counter() - start)
+            if mode == 'warm' and len(samples) > 1:
+                samples = samples[1:]  # la primera corrida crea el artefacto
+            results[f'startup.{mode}.median_s'] = metric(statistics.median(samples))
+    return results
+
+
+# --- Entrenamiento ---
+
+def write_scaled_dataset(rows, path, seed=42):
+    import pandas as pd
+    import train_model
+
+    df = pd.read_csv(train_model.DATA_FILE_PATH)
+    df.sample(n=rows, replace=True, random_state=seed).to_csv(path, index=False)
+
+
+def bench_train(row_counts):
+    import train_model
+
+    results = {}
+    datasets = [('original', train_model.DATA_FILE_PATH)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rows in row_counts:
+            path = os.path.join(tmp_dir, f'sales_{rows}.csv')
+            write_scaled_dataset(rows, path)
+            datasets.append((str(rows), path))
+        for name, path in datasets:
+            artifact = train_model.build_artifact(path)
+            results[f'train.{name}.seconds'] = metric(artifact['train_seconds'])
+            print(f"  entrenamiento {name}: {artifact['train_seconds']:.2f} s")
+    return results
+
+
+# --- Latencia con el cliente de pruebas de Flask ---
+
+def bench_latency(n_requests, warmup=50):
+    import app
+
+    client = app.app.test_client()
+    questionnaires = sample_questionnaires(n_requests + warmup, unknown_ratio=0.05)
+    results = {}
+    for mode, use_table in (('lookup', True), ('model', False)):
+        table = app.bundle.lookup_table
+        if not use_table:
+            app.bundle.lookup_table = {}
+        try:
+            samples = []
+            for i, answers in enumerate(questionnaires):
+                start = time.perf_counter()
+                response = client.post('/recommend', json=answers)
+                elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    raise RuntimeError(f"/recommend respondió {response.status_code}: {response.get_data(as_text=True)}")
+                if i >= warmup:
+                    samples.append(elapsed)
+        finally:
+            app.bundle.lookup_table = table
+        for name, value in percentiles(samples).items():
+            results[f'latency.{mode}.{name}_ms'] = metric(value * 1000)
+
+    start = time.perf_counter()
+    count = sum(1 for _ in app.recommend_batch(questionnaires))
+    results['latency.batch.rows_per_s'] = metric(count / (time.perf_counter() - start), better='higher')
+    return results
+
+
+# --- Carga concurrente contra gunicorn ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError(f"gunicorn no respondió en {timeout} s")
+
+
+def run_load(url, questionnaires, concurrency, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(worker_id):
+        rng = random.Random(worker_id)
+        local = []
+        local_errors = 0
+        while time.monotonic() < deadline:
+            body = json.dumps(rng.choice(questionnaires)).encode()
+            req = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+            start = time.perf_counter()
+            try:
+                urllib.request.urlopen(req, timeout=10).read()
+                local.append(time.perf_counter() - start)
+            except (urllib.error.URLError, ConnectionError, OSError):
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - start
+
+
+def bench_load(worker_counts, concurrency, duration):
+    questionnaires = sample_questionnaires(500)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for workers in worker_counts:
+            port = free_port()
+            env = dict(os.environ, PYTHONWARNINGS='ignore', METRICS_DIR=os.path.join(tmp_dir, f'metrics-{workers}'))
+            server = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-w', str(workers),
+                 '-b', f'127.0.0.1:{port}', 'app:app'],
+                cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                wait_until_ready(f'http://127.0.0.1:{port}/')
+                latencies, errors, elapsed = run_load(f'http://127.0.0.1:{port}/recommend', questionnaires, concurrency, duration)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            prefix = f'load.workers_{workers}'
+            results[f'{prefix}.requests_per_s'] = metric(len(latencies) / elapsed, better='higher')
+            results[f'{prefix}.errors'] = metric(errors)
+            if latencies:
+                for name, value in percentiles(latencies).items():
+                    results[f'{prefix}.{name}_ms'] = metric(value * 1000)
+            print(f"  {workers} worker(s): {len(latencies) / elapsed:.0f} req/s, {errors} errores")
+    return results
+
+
+# --- Comparación contra una línea base ---
+
+def compare(baseline, current, threshold):
+    """Devuelve las métricas que empeoraron más que ``threshold`` (fracción)."""
+    regressions = []
+    for name, entry in sorted(current['results'].items()):
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        if base['value']:
+            change = (entry['value'] - base['value']) / abs(base['value'])
+        else:
+            # Por ejemplo, pasar de 0 errores a alguno
+            change = float('inf') if entry['value'] > 0 else 0.0
+        worse = change > threshold if entry['better'] == 'lower' else change < -threshold
+        status = 'REGRESIÓN' if worse else 'ok'
+        print(f"{status:>10}  {name}: {base['value']:.4g} -> {entry['value']:.4g} ({change:+.1%})")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def environment():
+    import numpy
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(sub):
+        sub.add_argument('--output', help='Archivo JSON donde guardar los resultados')
+        sub.add_argument('--baseline', help='Compara contra este JSON al terminar')
+        sub.add_argument('--threshold', type=float, default=0.10, help='Tolerancia de la comparación (0.10 = 10%%)')
+
+    startup = subparsers.add_parser('startup', help='Tiempo de arranque de app.py')
+    startup.add_argument('--repeat', type=int, default=5)
+    train = subparsers.add_parser('train', help='Tiempo de entrenamiento con datos escalados')
+    train.add_argument('--rows', type=int_list, default=[10_000, 100_000, 1_000_000])
+    latency = subparsers.add_parser('latency', help='Latencia de /recommend con el cliente de pruebas')
+    latency.add_argument('--requests', type=int, default=2000)
+    load = subparsers.add_parser('load', help='Carga concurrente contra gunicorn')
+    load.add_argument('--workers', type=int_list, default=[1, 2, 4])
+    load.add_argument('--concurrency', type=int, default=8)
+    load.add_argument('--duration', type=float, default=10.0)
+    everything = subparsers.add_parser('all', help='Todos los benchmarks')
+    everything.add_argument('--repeat', type=int, default=5)
+    everything.add_argument('--rows', type=int_list, default=[10_000, 100_000, 1_000_000])
+    everything.add_argument('--requests', type=int, default=2000)
+    everything.add_argument('--workers', type=int_list, default=[1, 2, 4])
+    everything.add_argument('--concurrency', type=int, default=8)
+    everything.add_argument('--duration', type=float, default=10.0)
+    for sub in (startup, train, latency, load, everything):
+        add_common(sub)
+
+    cmp = subparsers.add_parser('compare', help='Compara dos archivos de resultados')
+    cmp.add_argument('baseline_file')
+    cmp.add_argument('current_file')
+    cmp.add_argument('--threshold', type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        with open(args.baseline_file) as f:
+            baseline = json.load(f)
+        with open(args.current_file) as f:
+            current = json.load(f)
+        return 1 if compare(baseline, current, args.threshold) else 0
+
+    results = {}
+    if args.command in ('startup', 'all'):
+        print('Arranque...')
+        results.update(bench_startup(args.repeat))
+    if args.command in ('train', 'all'):
+        print('Entrenamiento...')
+        results.update(bench_train(args.rows))
+    if args.command in ('latency', 'all'):
+        print('Latencia...')
+        results.update(bench_latency(args.requests))
+    if args.command in ('load', 'all'):
+        print('Carga con gunicorn...')
+        results.update(bench_load(args.workers, args.concurrency, args.duration))
+
+    report = {'environment': environment(), 'results': results}
+    for name, entry in sorted(results.items()):
+        print(f"  {name}: {entry['value']:.4g}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return 1 if compare(baseline, report, args.threshold) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import numpy as np
+
+# --- Codificador de características ---
+# Sustituye a pd.get_dummies + reindex: traduce las respuestas del cuestionario
+# directamente a una matriz one-hot de NumPy con el mismo orden de columnas que se
+# usó al entrenar. Lo usan tanto train_model.py como app.py, así que el
+# entrenamiento y el servidor no pueden codificar de forma distinta.
+
+
+class UnknownCategoryError(ValueError):
+    """Alguna respuesta no corresponde a ninguna categoría vista al entrenar."""
+
+    def __init__(self, unknown):
+        self.unknown = unknown  # campo -> valor desconocido (o None si falta)
+        details = ', '.join(f"{f}={v!r}" for f, v in unknown.items())
+        super().__init__(f"Categorías desconocidas: {details}")
+
+
+class FeatureEncoder:
+
+    def __init__(self, features, categories):
+        self.features = list(features)
+        self.categories = {f: list(categories[f]) for f in self.features}
+        # Mismo orden que pd.get_dummies: por campo, y dentro de cada campo por categoría
+        self.columns = [f"{f}_{c}" for f in self.features for c in self.categories[f]]
+        self.column_index = {}
+        position = 0
+        for f in self.features:
+            self.column_index[f] = {}
+            for c in self.categories[f]:
+                self.column_index[f][c] = position
+                position += 1
+
+    def encode_many(self, records, strict=True):
+        """Codifica una lista de dicts en una matriz (n, n_columnas) de uint8.
+
+        Con ``strict=True`` lanza UnknownCategoryError ante la primera respuesta
+        desconocida; con ``strict=False`` devuelve además la lista de filas
+        desconocidas (índice, {campo: valor}) para que el llamador decida.
+        """
+        matrix = np.zeros((len(records), len(self.columns)), dtype=np.uint8)
+        unknown_rows = []
+        for i, record in enumerate(records):
+            unknown = None
+            for f in self.features:
+                position = self.column_index[f].get(record.get(f))
+                if position is None:
+                    if unknown is None:
+                        unknown = {}
+                    unknown[f] = record.get(f)
+                else:
+                    matrix[i, position] = 1
+            if unknown:
+                if strict:
+                    raise UnknownCategoryError(unknown)
+                unknown_rows.append((i, unknown))
+        if strict:
+            return matrix
+        return matrix, unknown_rows
+
+    def encode_frame(self, df):
+        """Codifica un DataFrame completo de forma vectorizada (para entrenar)."""
+        matrix = np.zeros((len(df), len(self.columns)), dtype=np.uint8)
+        rows = np.arange(len(df))
+        for f in self.features:
+            codes = df[f].astype(str).map(self.column_index[f])
+            if codes.isna().any():
+                raise UnknownCategoryError({f: df[f][codes.isna()].iloc[0]})
+            matrix[rows, codes.to_numpy(dtype=np.intp)] = 1
+        return matrix
@@ -0,0 +1,28 @@
+import gc
+import glob
+import os
+import tempfile
+
+# Carga app.py (y el modelo) una sola vez en el proceso maestro antes de crear los
+# workers: con fork, los workers comparten esas páginas de memoria (copy-on-write).
+preload_app = True
+
+# Directorio compartido donde cada worker vuelca sus métricas para que /metrics
+# las sume. Se fija aquí porque este archivo se ejecuta antes de cargar app.py,
+# y se vacía para no arrastrar los contadores de un arranque anterior.
+metrics_dir = os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'michoacana-metrics'))
+os.makedirs(metrics_dir, exist_ok=True)
+for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+    os.remove(path)
+
+
+def when_ready(server):
+    # Mueve los objetos ya cargados a la generación permanente del recolector de
+    # basura, para que sus recorridos no toquen (y copien) las páginas compartidas.
+    gc.freeze()
+
+
+def worker_exit(server, worker):
+    # Último volcado de las métricas del worker antes de salir
+    from metrics import registry
+    registry.flush()
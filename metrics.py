@@ -0,0 +1,172 @@
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Métricas ---
+# Contadores e histogramas en memoria del worker, con muy poco costo en la ruta
+# caliente. Con METRICS_DIR definido cada proceso vuelca su copia a
+# METRICS_DIR/<pid>.json cada FLUSH_INTERVAL segundos y /metrics suma
+# los archivos de todos los workers de gunicorn antes de exponerlos en el formato
+# de texto de Prometheus.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+FLUSH_INTERVAL = 5.0
+
+
+class Registry:
+
+    def __init__(self, directory=None, flush_interval=FLUSH_INTERVAL, buckets=DEFAULT_BUCKETS):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.buckets = tuple(buckets)
+        self._descriptions = {}  # nombre -> (tipo, ayuda)
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            # Un worker recién creado no hereda los valores del proceso maestro:
+            # esos ya quedaron en el archivo del maestro y se contarían dos veces.
+            os.register_at_fork(after_in_child=self._reset)
+        if directory:
+            atexit.register(self.flush)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}  # clave -> [conteos por bucket..., +Inf, suma]
+        self._last_flush = time.monotonic()
+        self._flusher = None
+
+    def describe(self, name, metric_type, help_text):
+        self._descriptions[name] = (metric_type, help_text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        position = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[position] += 1
+            histogram[-1] += seconds
+
+    @contextmanager
+    def time(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            counters = [[name, list(labels), value] for (name, labels), value in self._counters.items()]
+            histograms = [[name, list(labels), list(values)] for (name, labels), values in self._histograms.items()]
+        return {'counters': counters, 'histograms': histograms}
+
+    def flush(self):
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Las métricas nunca deben tumbar una petición
+            pass
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        if not self.directory:
+            return
+        if self._flusher is None:
+            # Un hilo por proceso vuelca también cuando el worker está ocioso,
+            # para que /metrics (atendido por otro worker) no quede desactualizado
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def collect(self):
+        """Suma las métricas de todos los procesos (o solo las propias sin METRICS_DIR)."""
+        if not self.directory:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush()
+            snapshots = []
+            for path in glob.glob(os.path.join(self.directory, '*.json')):
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(label) for label in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                merged = histograms.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    merged[i] += value
+        return counters, histograms
+
+    def render(self):
+        """Formato de texto de exposición de Prometheus."""
+        counters, histograms = self.collect()
+        lines = []
+        seen = set()
+
+        def header(name, default_type):
+            if name in seen:
+                return
+            seen.add(name)
+            metric_type, help_text = self._descriptions.get(name, (default_type, ''))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), values in sorted(histograms.items()):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-1])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry(os.environ.get('METRICS_DIR') or None)
@@ -95,6 +95,15 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
+    // El servidor manda image_url (y variantes AVIF/WebP si se corrió el build de recursos)
+    const productPicture = (product) => {
+        const imageUrl = product.image_url || `/static/images/${product.image}`;
+        const sources = (product.image_sources || [])
+            .map(source => `<source type="${source.type}" srcset="${source.srcset}" sizes="(max-width: 600px) 90vw, 480px">`)
+            .join('');
+        return `<picture>${sources}<img src="${imageUrl}" alt="${product.name}" class="product-image" decoding="async"></picture>`;
+    };
+
     const displayRecommendation = (product, weather) => {
         const weatherEmojis = {
             'soleado': '☀️',
@@ -111,7 +120,7 @@ document.addEventListener('DOMContentLoaded', () => {
             <div class="recommendation-card">
                 <h3>${product.name}</h3>
                 <p>Precio: ${product.price}</p>
-                <img src="/static/images/${product.image}" alt="${product.name}" class="product-image">
+                ${productPicture(product)}
                 <p class="justification">${product.justification}</p>
             </div>
             <button id="restart-button" class="option-button">Regresar</button>
@@ -0,0 +1,69 @@
+import json
+import os
+
+import pytest
+
+# Sin red: el clima viene del backend local (igual que en benchmarks/bench.py)
+os.environ.setdefault('WEATHER_BACKEND', 'stub')
+
+import app  # noqa: E402
+
+VALID = {'tipo_producto_general': 'Paletas', 'tipo_antojo': 'dulce', 'base': 'agua', 'tipo_sabor': 'clasico'}
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def post_batch(client, questionnaires):
+    response = client.post('/recommend/batch', json=questionnaires)
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+@pytest.mark.parametrize('bad_answers', [
+    {'base': ['agua']},
+    {'tipo_producto_general': 5},
+    {'tipo_sabor': {'clasico': True}},
+    {'tipo_antojo': '   '},
+])
+def test_bad_answer_types_are_reported_in_place(client, bad_answers):
+    results = post_batch(client, [VALID, dict(VALID, **bad_answers), VALID])
+
+    assert [r['index'] for r in results] == [0, 1, 2]
+    assert 'recommended_product' in results[0]
+    assert 'error' in results[1] and 'recommended_product' not in results[1]
+    assert 'recommended_product' in results[2]
+
+
+def test_non_object_rows_do_not_end_the_stream(client):
+    results = post_batch(client, [VALID, None, 'Paletas', VALID])
+
+    assert [('error' in r) for r in results] == [False, True, True, False]
+
+
+@pytest.mark.parametrize('body', [
+    None,
+    [VALID],
+    dict(VALID, base=['agua']),
+    dict(VALID, tipo_producto_general=5),
+    dict(VALID, k='muchos'),
+])
+def test_recommend_rejects_bad_input_without_counting_server_errors(client, body):
+    def server_errors():
+        counters, _ = app.registry.collect()
+        return sum(v for (name, _), v in counters.items() if name == 'recommend_errors_total')
+
+    before = server_errors()
+    response = client.post('/recommend', data=json.dumps(body), content_type='application/json')
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    assert server_errors() == before
+
+
+def test_recommend_accepts_valid_questionnaire(client):
+    response = client.post('/recommend', json=VALID)
+    assert response.status_code == 200
+    assert 'recommended_product' in response.get_json()
@@ -0,0 +1,94 @@
+import time
+import types
+
+import pytest
+
+import weather
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FlakyBackend:
+    """Backend de prueba que falla mientras ``failing`` sea verdadero."""
+
+    def __init__(self, weather_value):
+        self.weather = weather_value
+        self.failing = False
+        self.calls = 0
+
+    def fetch(self, city):
+        self.calls += 1
+        if self.failing:
+            raise weather.WeatherError('backend caído')
+        return self.weather
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # Solo el proveedor ve el reloj falso; los hilos siguen usando el real
+    monkeypatch.setattr(weather, 'time', types.SimpleNamespace(
+        monotonic=clock.monotonic, perf_counter=time.perf_counter, sleep=time.sleep))
+    return clock
+
+
+def wait_for_refreshes(provider, timeout=5):
+    deadline = time.monotonic() + timeout
+    while provider._refreshing:
+        assert time.monotonic() < deadline, 'el refresco en segundo plano no terminó'
+        time.sleep(0.001)
+
+
+def test_circuit_opens_serves_stale_and_recovers(clock):
+    backend = FlakyBackend('nublado')
+    provider = weather.WeatherProvider(backend, ttl=10, failure_threshold=3, cooldown=60)
+
+    # Sin valor en caché se responde el clima por defecto y se refresca en segundo plano
+    assert provider.get('CDMX') == weather.DEFAULT_WEATHER
+    wait_for_refreshes(provider)
+    assert provider.get('CDMX') == 'nublado'
+    assert backend.calls == 1
+
+    # Valor caducado y backend caído: se sigue sirviendo el valor viejo
+    backend.failing = True
+    clock.advance(11)
+    for _ in range(3):
+        assert provider.get('CDMX') == 'nublado'
+        wait_for_refreshes(provider)
+    assert backend.calls == 4
+    assert provider.circuit_open()
+
+    # Con el circuito abierto no se consulta el backend
+    assert provider.get('CDMX') == 'nublado'
+    wait_for_refreshes(provider)
+    assert backend.calls == 4
+
+    # Pasado el cooldown se vuelve a consultar y el circuito se cierra
+    backend.failing = False
+    backend.weather = 'lluvioso'
+    clock.advance(61)
+    assert not provider.circuit_open()
+    assert provider.get('CDMX') == 'nublado'
+    wait_for_refreshes(provider)
+    assert backend.calls == 5
+    assert provider.get('CDMX') == 'lluvioso'
+    assert not provider.circuit_open()
+
+
+def test_stub_backend_is_served_from_cache_within_ttl(clock):
+    provider = weather.WeatherProvider(weather.StubBackend('lluvioso'), ttl=10)
+    assert provider.refresh('CDMX') == 'lluvioso'
+    provider.backend.weather = 'soleado'
+    clock.advance(5)
+    assert provider.get('CDMX') == 'lluvioso'
+    assert not provider._refreshing
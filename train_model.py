@@ -1,35 +1,331 @@
 import pandas as pd
+import numpy as np
+import sklearn
 from sklearn.ensemble import RandomForestClassifier
 import joblib
+import argparse
+import contextlib
+import csv
+import hashlib
+import io
 import os
+import time
 
-print("Iniciando entrenamiento local...")
+from encoder import FeatureEncoder
 
-# 1. Carga de datos
 try:
-    # Usamos os.path.join para construir la ruta al archivo CSV
-    DATA_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'sales_data.csv')
-    df = pd.read_csv(DATA_FILE_PATH)
-except FileNotFoundError:
-    print("ERROR: sales_data.csv no encontrado. Verifica la carpeta 'data/'.")
-    exit()
-
-# 2. Preprocesamiento y definición de la IA
+    import fcntl
+except ImportError:  # Windows: sin bloqueo de archivos entre procesos
+    fcntl = None
+
+# --- Artefacto del modelo ---
+# El servidor carga el modelo ya entrenado desde MODEL_FILE_PATH en lugar de
+# reentrenarlo en cada worker. El artefacto guarda la suma de verificación del CSV
+# y la versión de scikit-learn para saber cuándo quedó obsoleto.
+#
+# modelo_ia.pkl se versiona en git y se despliega tal cual (Vercel no puede guardar
+# uno nuevo: sin él, cada arranque en frío reentrenaría). Al cambiar
+# data/sales_data.csv, el código de entrenamiento o la versión de scikit-learn
+# (fijada en requirements.txt), hay que regenerarlo con `python train_model.py` y
+# subirlo junto con el cambio; si no, el servidor lo detecta obsoleto y reentrena.
+#
+# Uso:
+#   python train_model.py                     # entrena y guarda el artefacto
+#   python train_model.py ingest ventas.csv   # agrega ventas validadas y reentrena
+#   python train_model.py retrain             # reentrena solo si el CSV cambió
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE_PATH = os.path.join(BASE_DIR, 'data', 'sales_data.csv')
+MODEL_FILE_PATH = os.environ.get('MODEL_FILE_PATH', os.path.join(BASE_DIR, 'modelo_ia.pkl'))
+ARTIFACT_VERSION = 3
+CHUNK_SIZE = int(os.environ.get('TRAIN_CHUNK_SIZE', '100000'))
+
 features = ['tipo_producto_general', 'tipo_antojo', 'base', 'tipo_sabor', 'weather']
-X = pd.get_dummies(df[features])
-y = df['product_id']
-
-# 3. Entrenar el modelo
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X, y)
-
-# 4. Guardar el modelo entrenado
-# La variable X.columns debe estar disponible para la predicción en el servidor
-# La guardamos en un archivo simple
-joblib.dump(model, 'modelo_ia.pkl')
-joblib.dump(X.columns.tolist(), 'model_columns.pkl') # Guardamos las columnas para usar en la predicción
-
-print("\n-------------------------------------")
-print("✅ MODELO GUARDADO EXITOSAMENTE.")
-print("Ahora, el archivo 'modelo_ia.pkl' está listo para subir a GitHub.")
-print("-------------------------------------")
\ No newline at end of file
+SALES_COLUMNS = features + ['product_id']
+
+
+def find_data_file():
+    # 1. Carpeta raíz (donde ejecutas el script)  2. Subcarpeta 'data/'
+    for path in ('sales_data.csv', os.path.join('data', 'sales_data.csv'), DATA_FILE_PATH):
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError('sales_data.csv')
+
+
+@contextlib.contextmanager
+def _locked(f, exclusive):
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+    try:
+        yield
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def data_checksum(data_path, size=None):
+    digest = hashlib.sha256()
+    remaining = os.path.getsize(data_path) if size is None else size
+    with open(data_path, 'rb') as f:
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+# --- Ingesta de ventas ---
+
+def validate_sale(record, known_products=None, answer_options=None):
+    """Devuelve la venta normalizada (solo SALES_COLUMNS) o lanza ValueError.
+
+    ``answer_options`` (campo -> valores permitidos) limita las características a
+    las respuestas conocidas; ``known_products`` hace lo mismo con product_id.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('la venta debe ser un objeto')
+    sale = {}
+    for column in SALES_COLUMNS:
+        value = record.get(column)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"falta el campo '{column}'")
+        if '\n' in value or '\r' in value:
+            raise ValueError(f"el campo '{column}' no puede tener saltos de línea")
+        if answer_options is not None and column in answer_options and value not in answer_options[column]:
+            raise ValueError(f"valor no permitido para '{column}': {value!r}")
+        sale[column] = value
+    if known_products is not None and sale['product_id'] not in known_products:
+        raise ValueError(f"producto desconocido: {sale['product_id']!r}")
+    return sale
+
+
+def append_sales(sales, data_path=DATA_FILE_PATH):
+    """Agrega ventas ya validadas al final del CSV, bajo un bloqueo exclusivo."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows([[s[c] for c in SALES_COLUMNS] for s in sales])
+    data = buffer.getvalue().encode('utf-8')
+    with open(data_path, 'a+b') as f:
+        with _locked(f, exclusive=True):
+            if f.seek(0, os.SEEK_END) > 0:
+                # El CSV original no termina en salto de línea
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    data = b'\n' + data
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# --- Entrenamiento ---
+
+class _BoundedReader(io.RawIOBase):
+    """Lee como mucho ``limit`` bytes: lo que se agregue al CSV después no entra."""
+
+    def __init__(self, f, limit):
+        self.f = f
+        self.remaining = limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self.remaining)
+        if n <= 0:
+            return 0
+        data = self.f.read(n)
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        return len(data)
+
+
+def _read_chunks(data_path, size, chunksize):
+    with open(data_path, 'rb') as f:
+        reader = io.BufferedReader(_BoundedReader(f, size))
+        for chunk in pd.read_csv(reader, chunksize=chunksize, usecols=SALES_COLUMNS, dtype=str, keep_default_na=False):
+            # Las filas incompletas se descartan
+            yield chunk[(chunk != '').all(axis=1)]
+
+
+def _fit(X, y):
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(X, y)
+    return model
+
+
+def train_chunked(data_path, size=None, chunksize=CHUNK_SIZE):
+    """Entrena leyendo el CSV por bloques, sin tener nunca el DataFrame completo.
+
+    Primera pasada: categorías y número de filas. Segunda pasada: se llena una
+    matriz uint8 preasignada, que ocupa mucho menos que las columnas de texto.
+    """
+    if size is None:
+        size = os.path.getsize(data_path)
+    categories = {f: set() for f in features}
+    rows = 0
+    for chunk in _read_chunks(data_path, size, chunksize):
+        for f in features:
+            categories[f].update(chunk[f].unique())
+        rows += len(chunk)
+    if rows == 0:
+        raise ValueError('El CSV de ventas no tiene filas válidas')
+
+    # El mismo codificador que usa el servidor, para que las columnas no se desalineen
+    feature_encoder = FeatureEncoder(features, {f: sorted(categories[f]) for f in features})
+    X = np.zeros((rows, len(feature_encoder.columns)), dtype=np.uint8)
+    y = np.empty(rows, dtype=object)
+    position = 0
+    for chunk in _read_chunks(data_path, size, chunksize):
+        X[position:position + len(chunk)] = feature_encoder.encode_frame(chunk)
+        y[position:position + len(chunk)] = chunk['product_id'].to_numpy()
+        position += len(chunk)
+
+    return _fit(X, y), feature_encoder.categories, rows
+
+
+def build_artifact(data_path, chunksize=CHUNK_SIZE):
+    # Se fija el tamaño del CSV al empezar (con el bloqueo compartido, así no se
+    # corta una venta a medio escribir); lo que llegue después queda para la próxima
+    with open(data_path, 'rb') as f:
+        with _locked(f, exclusive=False):
+            size = os.fstat(f.fileno()).st_size
+    start = time.perf_counter()
+    model, categories, rows = train_chunked(data_path, size, chunksize)
+    return {
+        'version': ARTIFACT_VERSION,
+        'model': model,
+        'categories': categories,
+        'rows': rows,
+        'data_checksum': data_checksum(data_path, size),
+        'sklearn_version': sklearn.__version__,
+        'train_seconds': time.perf_counter() - start,
+    }
+
+
+def save_artifact(artifact, model_path=MODEL_FILE_PATH):
+    # Se escribe a un archivo temporal y se renombra: un lector nunca ve un pickle a
+    # medias, y el cambio de archivo es lo que dispara la recarga en los workers.
+    tmp_path = f"{model_path}.tmp.{os.getpid()}"
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, model_path)
+
+
+def load_published_artifact(model_path=MODEL_FILE_PATH):
+    """Carga el artefacto publicado sin compararlo con el CSV (recarga en caliente)."""
+    try:
+        artifact = joblib.load(model_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"No se pudo leer el artefacto del modelo ({e}), se reentrenará.")
+        return None
+    if not isinstance(artifact, dict) or artifact.get('version') != ARTIFACT_VERSION:
+        return None
+    if artifact.get('sklearn_version') != sklearn.__version__:
+        return None
+    return artifact
+
+
+def load_artifact(model_path=MODEL_FILE_PATH, data_path=None):
+    """Devuelve el artefacto guardado, o None si no existe o está obsoleto."""
+    artifact = load_published_artifact(model_path)
+    if artifact is None:
+        return None
+    if data_path is not None and artifact.get('data_checksum') != data_checksum(data_path):
+        return None
+    return artifact
+
+
+def load_or_train(model_path=MODEL_FILE_PATH):
+    """Carga el artefacto si está vigente; si no, entrena y lo intenta guardar."""
+    try:
+        data_path = find_data_file()
+    except FileNotFoundError:
+        # Sin CSV no se puede verificar ni reentrenar: se usa el artefacto tal cual
+        data_path = None
+    artifact = load_artifact(model_path, data_path)
+    if artifact is not None:
+        return artifact, False
+    if data_path is None:
+        raise FileNotFoundError('sales_data.csv')
+    artifact = build_artifact(data_path)
+    try:
+        save_artifact(artifact, model_path)
+    except OSError as e:
+        # Por ejemplo, un sistema de archivos de solo lectura (Vercel)
+        print(f"No se pudo guardar el artefacto del modelo: {e}")
+    return artifact, True
+
+
+def retrain(data_path=DATA_FILE_PATH, model_path=MODEL_FILE_PATH):
+    """Reentrena y publica el artefacto si el CSV cambió.
+
+    Pensada para correr en un proceso aparte. Un bloqueo sobre ``<modelo>.lock``
+    evita que dos workers reentrenen a la vez; el segundo encuentra el artefacto
+    ya al día y no hace nada.
+    """
+    with open(f"{model_path}.lock", 'a') as lock_file:
+        with _locked(lock_file, exclusive=True):
+            if load_artifact(model_path, data_path) is not None:
+                return {'retrained': False}
+            artifact = build_artifact(data_path)
+            save_artifact(artifact, model_path)
+    return {'retrained': True, 'rows': artifact['rows'], 'train_seconds': artifact['train_seconds']}
+
+
+def _print_retrain_summary(summary):
+    if summary['retrained']:
+        print(f"Modelo reentrenado en {summary['train_seconds']:.2f} s con {summary['rows']} filas.")
+    else:
+        print("El modelo ya estaba al día.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Entrenamiento e ingesta de ventas del modelo de recomendación.')
+    subparsers = parser.add_subparsers(dest='command')
+    ingest = subparsers.add_parser('ingest', help='Agrega las ventas de un CSV y reentrena')
+    ingest.add_argument('sales_file')
+    ingest.add_argument('--no-retrain', action='store_true')
+    subparsers.add_parser('retrain', help='Reentrena solo si el CSV cambió')
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        from products import ANSWER_OPTIONS, PRODUCTS_DB
+        with open(args.sales_file, newline='', encoding='utf-8') as f:
+            try:
+                sales = [validate_sale(record, known_products=PRODUCTS_DB, answer_options=ANSWER_OPTIONS)
+                         for record in csv.DictReader(f)]
+            except ValueError as e:
+                print(f"ERROR: venta inválida ({e}). No se agregó nada.")
+                exit(1)
+        # El mismo CSV que usa app.py, para que ambos no reentrenen uno sobre otro
+        data_path = find_data_file()
+        append_sales(sales, data_path)
+        print(f"{len(sales)} ventas agregadas a {data_path}.")
+        if not args.no_retrain:
+            _print_retrain_summary(retrain(data_path))
+        exit()
+
+    if args.command == 'retrain':
+        _print_retrain_summary(retrain(find_data_file()))
+        exit()
+
+    print("Iniciando entrenamiento local...")
+
+    # 1. Carga de datos y entrenamiento
+    try:
+        artifact = build_artifact(find_data_file())
+    except FileNotFoundError:
+        print("ERROR: sales_data.csv no encontrado. Verifica la carpeta 'data/'.")
+        exit()
+
+    # 2. Guardar el modelo entrenado (con sus categorías) para la predicción en el servidor
+    save_artifact(artifact)
+
+    print("\n-------------------------------------")
+    print("✅ MODELO GUARDADO EXITOSAMENTE.")
+    print(f"Entrenado en {artifact['train_seconds']:.2f} s con scikit-learn {artifact['sklearn_version']}.")
+    print("Ahora, el archivo 'modelo_ia.pkl' está listo para subir a GitHub.")
+    print("-------------------------------------")
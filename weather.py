@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Proveedor de clima ---
+# La petición a /recommend nunca toca la red: siempre se responde con el último
+# valor conocido (o el clima por defecto) y la actualización se hace en segundo
+# plano cuando el valor en caché caduca.
+
+DEFAULT_WEATHER = 'soleado'  # Clima por defecto en caso de fallo
+
+
+class WeatherError(Exception):
+    """Error al consultar el backend de clima."""
+
+
+def classify_weather(weather_main):
+    weather_desc = weather_main.lower()
+    if 'cloud' in weather_desc or 'mist' in weather_desc or 'fog' in weather_desc:
+        return 'nublado'
+    elif 'rain' in weather_desc or 'drizzle' in weather_desc or 'thunderstorm' in weather_desc:
+        return 'lluvioso'
+    elif 'clear' in weather_desc:
+        return 'soleado'
+    else:
+        return 'soleado'
+
+
+class OpenWeatherMapBackend:
+    """Backend real: OpenWeatherMap con conexiones reutilizadas (keep-alive)."""
+
+    base_url = "http://api.openweathermap.org/data/2.5/weather"
+
+    def __init__(self, api_key, timeout=5, pool_size=4):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, city):
+        params = {'q': city, 'appid': self.api_key, 'units': 'metric', 'lang': 'es'}
+        try:
+            response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Error de conexión o respuesta que no es JSON
+            raise WeatherError(str(e)) from e
+        if data.get('cod') != 200:
+            # Error de API
+            raise WeatherError(f"Respuesta inválida de la API de clima: {data.get('message')}")
+        return classify_weather(data['weather'][0]['main'])
+
+
+class StubBackend:
+    """Backend local para pruebas y benchmarks sin red."""
+
+    def __init__(self, weather=DEFAULT_WEATHER, delay=0.0):
+        self.weather = weather
+        self.delay = delay
+
+    def fetch(self, city):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.weather
+
+
+class WeatherProvider:
+    """Caché de clima por ciudad con TTL, refresco en segundo plano y circuit breaker.
+
+    - Si el valor está vigente se devuelve directamente.
+    - Si caducó se devuelve el valor viejo y se lanza un refresco en un hilo
+      (stale-while-revalidate).
+    - Tras ``failure_threshold`` fallos seguidos el circuito se abre y no se
+      vuelve a consultar el backend hasta que pasen ``cooldown`` segundos.
+    """
+
+    def __init__(self, backend, ttl=600, failure_threshold=3, cooldown=60, registry=None):
+        self.backend = backend
+        self.registry = registry
+        self.ttl = ttl
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._reset_state()
+        # Los hilos no sobreviven a un fork (workers de gunicorn): el hijo
+        # empieza con un lock nuevo y sin refrescos "en curso" colgados.
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset_state(self):
+        self._lock = threading.Lock()
+        self._cache = {}  # ciudad -> (clima, momento en que se obtuvo)
+        self._refreshing = set()
+        self._failures = 0
+        self._open_until = 0.0
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+    def get(self, city):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(city)
+        if entry is None or now - entry[1] > self.ttl:
+            self._schedule_refresh(city)
+        if entry is None:
+            if self.registry:
+                self.registry.inc('weather_default_total')
+            return DEFAULT_WEATHER
+        return entry[0]
+
+    def circuit_open(self):
+        return time.monotonic() < self._open_until
+
+    def refresh(self, city):
+        """Consulta el backend de forma síncrona y actualiza la caché."""
+        start = time.perf_counter()
+        try:
+            weather = self.backend.fetch(city)
+        except Exception:
+            if self.registry:
+                self.registry.inc('weather_fetch_errors_total')
+            with self._lock:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._open_until = time.monotonic() + self.cooldown
+            return None
+        if self.registry:
+            self.registry.observe('weather_fetch_seconds', time.perf_counter() - start)
+        with self._lock:
+            self._cache[city] = (weather, time.monotonic())
+            self._failures = 0
+            self._open_until = 0.0
+        return weather
+
+    def _schedule_refresh(self, city):
+        if self.circuit_open():
+            return
+        with self._lock:
+            if city in self._refreshing:
+                return
+            self._refreshing.add(city)
+        thread = threading.Thread(target=self._refresh_in_background, args=(city,), daemon=True)
+        thread.start()
+
+    def _refresh_in_background(self, city):
+        try:
+            self.refresh(city)
+        finally:
+            with self._lock:
+                self._refreshing.discard(city)
+
+
+def provider_from_env(api_key, registry=None):
+    """Construye el proveedor según WEATHER_BACKEND ('openweathermap' o 'stub')."""
+    backend_name = os.environ.get('WEATHER_BACKEND', 'openweathermap')
+    if backend_name == 'stub':
+        backend = StubBackend(
+            weather=os.environ.get('WEATHER_STUB_VALUE', DEFAULT_WEATHER),
+            delay=float(os.environ.get('WEATHER_STUB_DELAY', '0')),
+        )
+    elif backend_name == 'openweathermap':
+        backend = OpenWeatherMapBackend(api_key)
+    else:
+        raise ValueError(f"WEATHER_BACKEND desconocido: {backend_name}")
+    return WeatherProvider(
+        backend,
+        ttl=float(os.environ.get('WEATHER_TTL', '600')),
+        failure_threshold=int(os.environ.get('WEATHER_FAILURE_THRESHOLD', '3')),
+        cooldown=float(os.environ.get('WEATHER_COOLDOWN', '60')),
+        registry=registry,
+    )